@@ -18,13 +18,15 @@
 # Potentially incorporate supplementary map layers depicting congressional districts or energy resources.
 
 # Import necessary libraries for Dash and callbacks
-from dash import Dash, html, dcc, callback, Input, Output, State, no_update
+from dash import Dash, html, dcc, Input, Output, State, no_update, ClientsideFunction
 import dash_ag_grid as dag
 import dash_leaflet as dl
 import dash_bootstrap_components as dbc
 import dash_mantine_components as dmc
 import pandas as pd
 import json
+import base64
+import geobuf
 import geopandas as gpd
 import plotly.express as px
 import plotly.graph_objects as go
@@ -34,6 +36,7 @@ from datetime import datetime
 import numpy as np
 import re
 import pandas as pd
+from utils.profiling import profile_callback, register_profile_routes
 
 
 # Load data for AG Grid and Leaflet Map
@@ -75,6 +78,7 @@ app = Dash(
 )
 # app.scripts.append_script({"external_scripts": "assets/dashAgGridComponentFunctions.js"})
 server = app.server
+register_profile_routes(server)
 
 # Step 1: Extract unique NEPA Trigger values
 nepa_triggers = df_eis_lines['NEPA Trigger'].unique()
@@ -124,6 +128,29 @@ chip_filter=html.Div(
     ]
 )
 
+# Zoom range of the map. Lines span hundreds of miles, so street level adds nothing.
+MAP_MIN_ZOOM = 3
+MAP_MAX_ZOOM = 10
+# Coordinate precision (decimal places) for map geometries sent to the browser.
+# 3 places is ~110 m, about one screen pixel at MAP_MAX_ZOOM.
+GEOBUF_PRECISION = 3
+
+
+# Function to encode GeoJSON as quantized, delta-encoded geobuf for dl.GeoJSON.
+# Tooltips are rendered server-side, so features only keep their Name.
+def to_geobuf(geojson, precision=GEOBUF_PRECISION):
+    features = [
+        {
+            "type": "Feature",
+            "geometry": feature["geometry"],
+            "properties": {"Name": feature["properties"].get("Name")},
+        }
+        for feature in geojson["features"]
+    ]
+    collection = {"type": "FeatureCollection", "features": features}
+    return base64.b64encode(geobuf.encode(collection, precision)).decode()
+
+
 # Function to create tooltip content
 def create_tooltip_content(feature):
     props = feature["properties"]
@@ -191,10 +218,13 @@ app.layout = dbc.Container(
                             dl.Map(
                                 center=[37.0902, -95.7129],
                                 zoom=3,
+                                minZoom=MAP_MIN_ZOOM,
+                                maxZoom=MAP_MAX_ZOOM,
                                 children=[
                                     dl.TileLayer(),
                                     dl.GeoJSON(
-                                        data=eis_lines_geojson,
+                                        data=to_geobuf(eis_lines_geojson),
+                                        format="geobuf",
                                         id="map-geojson",
                                         children=[
                                             dl.Tooltip(
@@ -320,6 +350,7 @@ app.layout = dbc.Container(
         Input("eis-lines-grid", "selectedRows"),
     ],
 )
+@profile_callback
 def update_based_on_grid_selection(virtualRowData, selected_rows):
     gdff = (
         eis_lines_gdf
@@ -344,7 +375,8 @@ def update_based_on_grid_selection(virtualRowData, selected_rows):
     return [
         dl.TileLayer(),
         dl.GeoJSON(
-            data=filtered_geojson,
+            data=to_geobuf(filtered_geojson),
+            format="geobuf",
             id="map-geojson",
             children=[
                 dl.Tooltip(
@@ -363,6 +395,7 @@ def update_based_on_grid_selection(virtualRowData, selected_rows):
         Input("eis-lines-grid", "selectedRows"),
     ],
 )
+@profile_callback
 def update_gantt_chart(rows, selected_rows):
     dff = df_eis_lines if rows is None else pd.DataFrame(rows)
     selected_names = (
@@ -493,13 +526,13 @@ def update_gantt_chart(rows, selected_rows):
     return fig
 
 
-@callback(
+# Pure UI callbacks run in the browser (assets/dashClientsideCallbacks.js)
+app.clientside_callback(
+    ClientsideFunction(namespace="ui", function_name="drawerDemo"),
     Output("drawer-simple", "opened"),
     Input("drawer-demo-button", "n_clicks"),
     prevent_initial_call=True,
 )
-def drawer_demo(n_clicks):
-    return True
 
 @app.callback(
     [Output("modal", "is_open"), Output("modal-body", "children"),Output("modal-header", "children")],
@@ -507,6 +540,7 @@ def drawer_demo(n_clicks):
     [State("modal", "is_open")],
     suppress_callback_exceptions=True,
 )
+@profile_callback
 def toggle_modal(cell, is_open):
     if cell and cell["colId"] == "Details":
         row = df_eis_lines.loc[(int(cell["rowId"])+1)]
@@ -629,17 +663,16 @@ def toggle_modal(cell, is_open):
 
     return is_open, no_update, no_update
    
-@app.callback(
+app.clientside_callback(
+    ClientsideFunction(namespace="ui", function_name="debugCellClick"),
     Output("debug", "children"),
     [Input("eis-lines-grid", "cellClicked")],
 )
-def debug_cell_click(cell):
-    if cell:
-        return str(cell)
-    return "No cell clicked yet"
 
-@app.callback(
+app.clientside_callback(
+    ClientsideFunction(namespace="ui", function_name="updateGridBasedOnSelections"),
     Output("eis-lines-grid", "filterModel"),
+    # Order must match chipFilterColumns in assets/dashClientsideCallbacks.js
     [
         Input("nepa-trigger-chips", "value"),
         Input("region-chips", "value"),
@@ -649,51 +682,13 @@ def debug_cell_click(cell):
     State("eis-lines-grid", "filterModel"),
     prevent_initial_call=True,
 )
-def update_grid_based_on_selections(nepa_triggers, regions, project_drivers, nepa_status, model):
-    model["NEPA Trigger"] = {
-        "filterType": "text",
-        "operator": "OR",
-        "conditions": [
-            {"filterType": "text", "type": "equals", "filter": trigger}
-            for trigger in nepa_triggers
-        ],
-    }
-    model["Region"] = {
-        "filterType": "text",
-        "operator": "OR",
-        "conditions": [
-            {"filterType": "text", "type": "equals", "filter": region}
-            for region in regions
-        ],
-    }
-    model["Project Drivers (As determined by CThree)"] = {
-        "filterType": "text",
-        "operator": "OR",
-        "conditions": [
-            {"filterType": "text", "type": "equals", "filter": driver}
-            for driver in project_drivers
-        ],
-    }
-    model["Status of NEPA review"] = {
-        "filterType": "text",
-        "operator": "OR",
-        "conditions": [
-            {"filterType": "text", "type": "equals", "filter": status}
-            for status in nepa_status
-        ],
-    }
-    return model
 
-
-@app.callback(
+app.clientside_callback(
+    ClientsideFunction(namespace="ui", function_name="toggleCollapse"),
     Output("chip-collapse", "is_open"),
     [Input("chip-collapse-button", "n_clicks")],
     [State("chip-collapse", "is_open")],
 )
-def toggle_collapse(n, is_open):
-    if n:
-        return not is_open
-    return is_open
 
 # Run the Dash app
 if __name__ == "__main__":
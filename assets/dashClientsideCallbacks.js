@@ -0,0 +1,60 @@
+var dashclientside = (window.dash_clientside = window.dash_clientside || {})
+
+// AG Grid column filtered by each chip group. Must stay in the same order as
+// the chip Inputs of updateGridBasedOnSelections in app.py.
+var chipFilterColumns = [
+  'NEPA Trigger',
+  'Region',
+  'Project Drivers (As determined by CThree)',
+  'Status of NEPA review'
+]
+
+// Build an OR'd set of "equals" text conditions for one column
+function chipsToFilter (values) {
+  return {
+    filterType: 'text',
+    operator: 'OR',
+    conditions: (values || []).map(function (value) {
+      return { filterType: 'text', type: 'equals', filter: value }
+    })
+  }
+}
+
+dashclientside.ui = {
+  // open/close the quick filter chips
+  toggleCollapse: function (n, isOpen) {
+    if (n) {
+      return !isOpen
+    }
+    return isOpen
+  },
+
+  // open the "About" drawer
+  drawerDemo: function (nClicks) {
+    return true
+  },
+
+  // show the last clicked cell for debugging
+  debugCellClick: function (cell) {
+    if (cell) {
+      return JSON.stringify(cell)
+    }
+    return 'No cell clicked yet'
+  },
+
+  // translate the chip selections into the grid's filterModel
+  updateGridBasedOnSelections: function (
+    nepaTriggers,
+    regions,
+    projectDrivers,
+    nepaStatus,
+    model
+  ) {
+    var selections = [nepaTriggers, regions, projectDrivers, nepaStatus]
+    var newModel = Object.assign({}, model)
+    chipFilterColumns.forEach(function (column, i) {
+      newModel[column] = chipsToFilter(selections[i])
+    })
+    return newModel
+  }
+}
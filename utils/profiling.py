@@ -0,0 +1,264 @@
+# On-demand profiling for Dash callbacks.
+#
+# Wrap a callback with @profile_callback (below @app.callback) and it will be
+# profiled when its name is listed in PROFILE_CALLBACKS ("*" for all) or when
+# a random draw falls under PROFILE_SAMPLE_RATE. Profiles are written to
+# PROFILE_DIR, only the newest PROFILE_KEEP are kept, and each file name
+# carries the callback name and a hash of its inputs.
+#
+# PROFILE_MODE picks the profiler:
+#   cprofile - cProfile, saved as .pstats (open with pstats / snakeviz)
+#   sample   - stack sampling, saved as collapsed-stack text (flamegraph.pl,
+#              speedscope)
+#
+# Failing to save a profile is logged and never affects the callback itself.
+# Only one cProfile capture runs at a time; concurrent callbacks run unprofiled.
+#
+# register_profile_routes(server) adds admin routes, only reachable when
+# PROFILE_ADMIN_TOKEN is set and passed as ?token= or X-Profile-Token:
+#   GET /_profiles              list stored profiles
+#   GET /_profiles/<filename>   download one profile
+#   GET /_profiles/config       show settings; ?callbacks=a,b&rate=0.1&mode=...
+#                               changes them for this worker process (token
+#                               accepted from the X-Profile-Token header only)
+
+import cProfile
+import functools
+import hashlib
+import hmac
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+
+from flask import abort, jsonify, request, send_from_directory
+
+logger = logging.getLogger(__name__)
+
+
+def _env_number(name, default, cast):
+    # A bad value must never stop the app from booting; fall back instead
+    value = os.environ.get(name, "")
+    try:
+        return cast(value)
+    except ValueError:
+        if value:
+            logger.warning("Ignoring invalid %s=%r, using %r", name, value, default)
+        return default
+
+
+PROFILE_DIR = os.path.abspath(os.environ.get("PROFILE_DIR", "profiles"))
+PROFILE_KEEP = _env_number("PROFILE_KEEP", 20, int)
+PROFILE_SAMPLE_INTERVAL = _env_number("PROFILE_SAMPLE_INTERVAL", 0.005, float)
+PROFILE_EXTENSIONS = (".pstats", ".collapsed.txt")
+
+settings = {
+    "callbacks": {
+        name.strip()
+        for name in os.environ.get("PROFILE_CALLBACKS", "").split(",")
+        if name.strip()
+    },
+    "rate": _env_number("PROFILE_SAMPLE_RATE", 0.0, float),
+    "mode": os.environ.get("PROFILE_MODE", "cprofile"),
+}
+
+_save_lock = threading.Lock()
+# cProfile is interpreter-wide on Python 3.12+, so only one capture at a time
+_cprofile_lock = threading.Lock()
+
+
+def should_profile(name):
+    if "*" in settings["callbacks"] or name in settings["callbacks"]:
+        return True
+    return random.random() < settings["rate"]
+
+
+def hash_inputs(args, kwargs):
+    try:
+        payload = json.dumps([args, kwargs], sort_keys=True, default=str)
+    except Exception:
+        logger.exception("Could not hash callback inputs")
+        return "unhashable"
+    return hashlib.sha1(payload.encode()).hexdigest()[:12]
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """Collect collapsed stacks of one thread by polling its current frame.
+
+    Stacks are cut at ``root_code`` so they start at the profiled callback;
+    samples taken while it is not running are dropped.
+    """
+
+    def __init__(self, thread_id, root_code, interval=PROFILE_SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.root_code = root_code
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame))
+                if frame.f_code is self.root_code:
+                    break
+                frame = frame.f_back
+            if frame is None or self._stop.is_set():
+                continue
+            self.stacks[";".join(reversed(stack))] += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def collapsed(self):
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.items())
+
+    def dump(self, path):
+        with open(path, "w") as f:
+            f.write(self.collapsed())
+
+
+def _stored_profiles():
+    # Other gunicorn workers may delete files between listing and stat()
+    profiles = []
+    for entry in os.scandir(PROFILE_DIR):
+        if not entry.name.endswith(PROFILE_EXTENSIONS):
+            continue
+        try:
+            profiles.append((entry, entry.stat()))
+        except FileNotFoundError:
+            continue
+    return sorted(profiles, key=lambda item: item[1].st_mtime, reverse=True)
+
+
+def _prune():
+    for entry, _ in _stored_profiles()[PROFILE_KEEP:]:
+        try:
+            os.remove(entry.path)
+        except FileNotFoundError:
+            pass
+
+
+def _profile_path(name, input_hash, extension):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    now = time.time()
+    stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(now)) + f"-{int(now * 1000) % 1000:03d}"
+    return os.path.join(PROFILE_DIR, f"{stamp}_{name}_{input_hash}{extension}")
+
+
+def _save_profile(name, input_hash, extension, dump):
+    try:
+        with _save_lock:
+            dump(_profile_path(name, input_hash, extension))
+            _prune()
+    except Exception:
+        logger.exception("Could not save %s profile for %s", extension, name)
+
+
+def profile_callback(func):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not should_profile(func.__name__):
+            return func(*args, **kwargs)
+
+        input_hash = hash_inputs(args, kwargs)
+        if settings["mode"] == "sample":
+            sampler = StackSampler(threading.get_ident(), func.__code__)
+            sampler.start()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                sampler.stop()
+                _save_profile(func.__name__, input_hash, ".collapsed.txt", sampler.dump)
+
+        # Another callback is being profiled; run this one unprofiled
+        if not _cprofile_lock.acquire(blocking=False):
+            return func(*args, **kwargs)
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except Exception:
+            _cprofile_lock.release()
+            logger.exception("Could not start cProfile for %s", func.__name__)
+            return func(*args, **kwargs)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profiler.disable()
+            _cprofile_lock.release()
+            _save_profile(func.__name__, input_hash, ".pstats", profiler.dump_stats)
+
+    return wrapper
+
+
+def _check_token(allow_query=True):
+    token = os.environ.get("PROFILE_ADMIN_TOKEN")
+    supplied = request.headers.get("X-Profile-Token")
+    if not supplied and allow_query:
+        supplied = request.args.get("token")
+    if not token or not supplied or not hmac.compare_digest(
+        supplied.encode(), token.encode()
+    ):
+        abort(404)
+
+
+def register_profile_routes(server):
+    @server.route("/_profiles")
+    def list_profiles():
+        _check_token()
+        if not os.path.isdir(PROFILE_DIR):
+            return jsonify([])
+        return jsonify(
+            [
+                {"file": entry.name, "bytes": stat.st_size}
+                for entry, stat in _stored_profiles()
+            ]
+        )
+
+    @server.route("/_profiles/config")
+    def profile_config():
+        # Keep the token out of access logs for the route that changes state
+        _check_token(allow_query=False)
+        if "callbacks" in request.args:
+            settings["callbacks"] = {
+                name.strip()
+                for name in request.args["callbacks"].split(",")
+                if name.strip()
+            }
+        if "rate" in request.args:
+            try:
+                settings["rate"] = float(request.args["rate"])
+            except ValueError:
+                abort(400)
+        if request.args.get("mode") in ("cprofile", "sample"):
+            settings["mode"] = request.args["mode"]
+        return jsonify(
+            {
+                "callbacks": sorted(settings["callbacks"]),
+                "rate": settings["rate"],
+                "mode": settings["mode"],
+            }
+        )
+
+    @server.route("/_profiles/<path:filename>")
+    def download_profile(filename):
+        _check_token()
+        if not filename.endswith(PROFILE_EXTENSIONS):
+            abort(404)
+        return send_from_directory(PROFILE_DIR, filename, as_attachment=True)